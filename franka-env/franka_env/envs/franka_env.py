@@ -2,16 +2,18 @@ import cv2
 import gym
 import numpy as np
 import time
-import pickle
+from concurrent.futures import ThreadPoolExecutor, wait
 
 from frankateach.constants import (
     CAM_PORT,
+    CAM_RECV_TIMEOUT,
     GRIPPER_CLOSE,
     GRIPPER_OPEN,
     HOST,
     CONTROL_PORT,
 )
 from frankateach.messages import FrankaAction, FrankaState
+from frankateach.wire import pack_action, unpack_state
 from frankateach.network import (
     ZMQCameraSubscriber,
     create_request_socket,
@@ -51,6 +53,8 @@ class FrankaEnv(gym.Env):
             if sensor_type == "reskin":
                 self.n_sensors = 2
                 self.sensor_dim = 15
+            self._sensor_keys = [f"sensor{idx}" for idx in range(self.n_sensors)]
+            self._sensor_diff_keys = [f"{key}_diffs" for key in self._sensor_keys]
         self.sensor_params = sensor_params
 
         self.n_channels = 3
@@ -58,6 +62,7 @@ class FrankaEnv(gym.Env):
 
         self.franka_state = None
         self.curr_images = None
+        self.curr_frames = None
 
         self.action_space = gym.spaces.Box(
             low=-float("inf"), high=float("inf"), shape=(self.action_dim,)
@@ -104,7 +109,14 @@ class FrankaEnv(gym.Env):
                     host=HOST,
                     port=port,
                     topic_type="RGB",
+                    # Raise instead of blocking a pool worker forever when a
+                    # camera is down, so that the env can still shut down
+                    recv_timeout=CAM_RECV_TIMEOUT,
                 )
+            # One worker per camera so that the frame receptions overlap
+            self._cam_pool = ThreadPoolExecutor(
+                max_workers=max(1, len(self.image_subscribers))
+            )
 
             if self.sensor_type == "reskin":
                 self.sensor_subscriber = ReskinSensorSubscriber()
@@ -121,7 +133,7 @@ class FrankaEnv(gym.Env):
 
     def get_state(self):
         self.action_request_socket.send(b"get_state")
-        franka_state: FrankaState = pickle.loads(self.action_request_socket.recv())
+        franka_state: FrankaState = unpack_state(self.action_request_socket.recv())
         self.franka_state = franka_state
         return franka_state
 
@@ -140,29 +152,18 @@ class FrankaEnv(gym.Env):
             quat=quat,
             gripper=gripper,
             reset=False,
-            timestamp=time.time(),
+            timestamp=time.time_ns(),
         )
         # print("sending action to robot: ", franka_action)
 
-        self.action_request_socket.send(bytes(pickle.dumps(franka_action, protocol=-1)))
-        franka_state: FrankaState = pickle.loads(self.action_request_socket.recv())
+        self.action_request_socket.send(pack_action(franka_action))
+        franka_state: FrankaState = unpack_state(self.action_request_socket.recv())
         self.franka_state = franka_state
 
-        image_dict = {}
-        self.curr_images = []
-        for cam_id, subscriber in self.image_subscribers.items():
-            image, _ = subscriber.recv_rgb_image()
-            image_dict[f"pixels{cam_id}"] = cv2.resize(image, (self.width, self.height))
-            self.curr_images.append(image)
+        image_dict = self._get_images()
 
-        obs = {
-            "features": np.concatenate(
-                (franka_state.pos, franka_state.quat, [franka_state.gripper])
-            ),
-            "proprioceptive": np.concatenate(
-                (franka_state.pos, franka_state.quat, [franka_state.gripper])
-            ),
-        }
+        features = self._get_features(franka_state)
+        obs = {"features": features, "proprioceptive": features.copy()}
         if self.sensor_type == "reskin":
             try:
                 reskin_state = self._get_reskin_state()
@@ -183,31 +184,18 @@ class FrankaEnv(gym.Env):
             quat=np.zeros(4),
             gripper=GRIPPER_OPEN,
             reset=True,
-            timestamp=time.time(),
+            timestamp=time.time_ns(),
         )
 
-        self.action_request_socket.send(
-            bytes(pickle.dumps(franka_reset_action, protocol=-1))
-        )
-        franka_state: FrankaState = pickle.loads(self.action_request_socket.recv())
+        self.action_request_socket.send(pack_action(franka_reset_action))
+        franka_state: FrankaState = unpack_state(self.action_request_socket.recv())
         self.franka_state = franka_state
         print("reset done: ", franka_state)
 
-        image_dict = {}
-        self.curr_images = []
-        for cam_id, subscriber in self.image_subscribers.items():
-            image, _ = subscriber.recv_rgb_image()
-            image_dict[f"pixels{cam_id}"] = cv2.resize(image, (self.width, self.height))
-            self.curr_images.append(image)
+        image_dict = self._get_images()
 
-        obs = {
-            "features": np.concatenate(
-                (franka_state.pos, franka_state.quat, [franka_state.gripper])
-            ),
-            "proprioceptive": np.concatenate(
-                (franka_state.pos, franka_state.quat, [franka_state.gripper])
-            ),
-        }
+        features = self._get_features(franka_state)
+        obs = {"features": features, "proprioceptive": features.copy()}
         if self.sensor_type == "reskin":
             try:
                 reskin_state = self._get_reskin_state(update_baseline=True)
@@ -221,18 +209,49 @@ class FrankaEnv(gym.Env):
         print("returning obs")
         return obs
 
+    def _get_features(self, franka_state):
+        # Filled by slice assignment rather than concatenating (pos, quat, [gripper])
+        features = np.empty(self.feature_dim, dtype=np.float32)
+        features[:3] = franka_state.pos
+        features[3:7] = franka_state.quat
+        features[7] = franka_state.gripper
+        return features
+
+    def _get_images(self):
+        # All camera frames of a step share one contiguous
+        # (num_cameras, height, width, channels) array. The subscribers receive
+        # and resize into their slice concurrently (cv2 releases the GIL), and
+        # are conflated, so only the freshest frame of each camera is used.
+        # A new array is allocated per step since observations may be kept.
+        self.curr_frames = np.empty(
+            (len(self.image_subscribers), self.height, self.width, self.n_channels),
+            dtype=np.uint8,
+        )
+        futures = {
+            cam_id: self._cam_pool.submit(subscriber.recv_rgb_image_into, frame)
+            for (cam_id, subscriber), frame in zip(
+                self.image_subscribers.items(), self.curr_frames
+            )
+        }
+        # Wait for every camera before raising a failure (e.g. a receive
+        # timeout), so that no receive is still running on a subscriber socket
+        # when the next step submits another one
+        wait(futures.values())
+        image_dict = {}
+        self.curr_images = []
+        for (cam_id, future), frame in zip(futures.items(), self.curr_frames):
+            image, _ = future.result()
+            image_dict[f"pixels{cam_id}"] = frame
+            self.curr_images.append(image)
+        return image_dict
+
     def _get_reskin_state(self, update_baseline=False):
         sensor_state = self.sensor_subscriber.get_sensor_state()
         sensor_values = np.array(sensor_state["sensor_values"], dtype=np.float32)
         if update_baseline:
-            baseline_meas = []
-            while len(baseline_meas) < 5:
-                sensor_state = self.sensor_subscriber.get_sensor_state()
-                sensor_values = np.array(
-                    sensor_state["sensor_values"], dtype=np.float32
-                )
-                baseline_meas.append(sensor_values)
-            self.sensor_baseline = np.mean(baseline_meas, axis=0)
+            baseline_meas = self.sensor_subscriber.get_sensor_batch(5)
+            sensor_values = baseline_meas[-1]
+            self.sensor_baseline = baseline_meas.mean(axis=0)
             if self.subtract_sensor_baseline:
                 self.sensor_prev_state = sensor_values - self.sensor_baseline
             else:
@@ -242,28 +261,38 @@ class FrankaEnv(gym.Env):
 
         sensor_diff = sensor_values - self.sensor_prev_state
         self.sensor_prev_state = sensor_values
-        sensor_keys = [f"sensor{sensor_idx}" for sensor_idx in range(self.n_sensors)]
-        reskin_state = {}
-        for sidx, sensor_key in enumerate(sensor_keys):
-            reskin_state[sensor_key] = sensor_values[
-                sidx * self.sensor_dim : (sidx + 1) * self.sensor_dim
-            ]
-            reskin_state[f"{sensor_key}_diffs"] = sensor_diff[
-                sidx * self.sensor_dim : (sidx + 1) * self.sensor_dim
-            ]
+        # One row per sensor
+        sensor_values = sensor_values.reshape(self.n_sensors, self.sensor_dim)
+        sensor_diff = sensor_diff.reshape(self.n_sensors, self.sensor_dim)
+        reskin_state = dict(zip(self._sensor_keys, sensor_values))
+        reskin_state.update(zip(self._sensor_diff_keys, sensor_diff))
         return reskin_state
 
     def render(self, mode="rgb_array", width=640, height=480):
         assert self.curr_images is not None, "Must call reset() before render()"
         if mode == "rgb_array":
-            image_list = []
-            for im in self.curr_images:
-                image_list.append(cv2.resize(im, (width, height)))
+            # A fresh canvas per call, since rendered frames are usually
+            # collected. Each camera is resized straight into its column.
+            canvas = np.empty(
+                (height, width * len(self.curr_images), self.n_channels),
+                dtype=np.uint8,
+            )
+            for i, im in enumerate(self.curr_images):
+                cv2.resize(
+                    im, (width, height), dst=canvas[:, i * width : (i + 1) * width]
+                )
 
-            return np.concatenate(image_list, axis=1)
+            return canvas
         else:
             raise NotImplementedError
 
+    def close(self):
+        if self.use_robot:
+            self._cam_pool.shutdown(cancel_futures=True)
+            for subscriber in self.image_subscribers.values():
+                subscriber.stop()
+            self.action_request_socket.close()
+
 
 if __name__ == "__main__":
     env = FrankaEnv()
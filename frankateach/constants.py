@@ -8,6 +8,7 @@ STATE_PORT = 8900
 CONTROL_PORT = 8901
 COMMANDED_STATE_PORT = 8902
 RESKIN_STREAM_PORT = 12005
+CAM_RECV_TIMEOUT = 1000  # ms
 
 
 STATE_TOPIC = "state"
@@ -26,8 +27,8 @@ H_R_V_star = np.array([[-1, 0, 0, 0], [0, 0, 1, 0], [0, -1, 0, 0], [0, 0, 0, 1]]
 x_min, x_max = 0.2, 0.75
 y_min, y_max = -0.4, 0.4
 z_min, z_max = 0.05, 0.7  # 232, 550
-ROBOT_WORKSPACE_MIN = np.array([x_min, y_min, z_min])
-ROBOT_WORKSPACE_MAX = np.array([x_max, y_max, z_max])
+ROBOT_WORKSPACE_MIN = np.array([x_min, y_min, z_min], dtype=np.float32)
+ROBOT_WORKSPACE_MAX = np.array([x_max, y_max, z_max], dtype=np.float32)
 
 TRANSLATIONAL_POSE_VELOCITY_SCALE = 5
 ROTATIONAL_POSE_VELOCITY_SCALE = 0.75
@@ -218,13 +218,13 @@ class DataCollector:
 
         print(
             "Frequency of state savings: ",
-            (len(states) - 10) / (states[-1].timestamp - states[10].timestamp),
+            (len(states) - 10) / ((states[-1].timestamp - states[10].timestamp) / 1e9),
         )
 
         print(
             "Frequency of commanded state savings: ",
             (len(commanded_states) - 10)
-            / (commanded_states[-1].timestamp - commanded_states[10].timestamp),
+            / ((commanded_states[-1].timestamp - commanded_states[10].timestamp) / 1e9),
         )
 
     def save_reskin(self):
@@ -1,6 +1,5 @@
 import os
 from pathlib import Path
-import pickle
 import time
 import numpy as np
 
@@ -15,6 +14,7 @@ from deoxys.utils.config_utils import (
 from frankateach.utils import notify_component_start
 from frankateach.network import create_response_socket
 from frankateach.messages import FrankaAction, FrankaState
+from frankateach.wire import pack_state, unpack_action
 from frankateach.constants import (
     CONTROL_PORT,
     HOST,
@@ -44,9 +44,9 @@ class FrankaServer:
                 pos=pos.flatten().astype(np.float32),
                 quat=quat.flatten().astype(np.float32),
                 gripper=gripper,
-                timestamp=time.time(),
+                timestamp=time.time_ns(),
             )
-            return bytes(pickle.dumps(state, protocol=-1))
+            return pack_state(state)
         else:
             return b"state_error"
 
@@ -58,7 +58,7 @@ class FrankaServer:
                 if command == b"get_state":
                     self.action_socket.send(self.get_state())
                 else:
-                    franka_control: FrankaAction = pickle.loads(command)
+                    franka_control: FrankaAction = unpack_action(command)
                     if franka_control.reset:
                         self._robot.reset_joints(gripper_open=franka_control.gripper)
                         time.sleep(1)
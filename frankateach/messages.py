@@ -9,7 +9,7 @@ class FrankaState:
     pos: np.ndarray
     quat: np.ndarray
     gripper: np.ndarray
-    timestamp: float
+    timestamp: int  # nanoseconds since the epoch
     start_teleop: bool = False
 
 
@@ -19,7 +19,7 @@ class FrankaAction:
     quat: np.ndarray
     gripper: np.ndarray
     reset: bool
-    timestamp: float
+    timestamp: int  # nanoseconds since the epoch
 
 
 @dataclass
@@ -1,6 +1,5 @@
 import zmq
 import cv2
-import base64
 import numpy as np
 import pickle
 import blosc as bl
@@ -45,6 +44,14 @@ def create_response_socket(host, port):
 def create_request_socket(host, port):
     context = zmq.Context()
     socket = context.socket(zmq.REQ)
+    # REQ/REP is strictly lock-step, so at most one message is ever in flight
+    # and a high water mark of one is safe. Pending requests are dropped on
+    # close rather than delivered late.
+    socket.setsockopt(zmq.SNDHWM, 1)
+    socket.setsockopt(zmq.RCVHWM, 1)
+    socket.setsockopt(zmq.LINGER, 0)
+    socket.setsockopt(zmq.SNDBUF, 64 * 1024)
+    socket.setsockopt(zmq.RCVBUF, 64 * 1024)
     socket.connect("tcp://{}:{}".format(host, port))
     return socket
 
@@ -127,6 +134,8 @@ class ZMQCameraPublisher(object):
     def _init_publisher(self):
         self.context = zmq.Context()
         self.socket = self.context.socket(zmq.PUB)
+        # Drop frames instead of queueing them for slow subscribers
+        self.socket.setsockopt(zmq.SNDHWM, 1)
         print("tcp://{}:{}".format(self._host, self._port))
         self.socket.bind("tcp://{}:{}".format(self._host, self._port))
 
@@ -135,7 +144,8 @@ class ZMQCameraPublisher(object):
 
     def pub_rgb_image(self, rgb_image, timestamp):
         _, buffer = cv2.imencode(".jpg", rgb_image, [int(cv2.IMWRITE_JPEG_QUALITY), 70])
-        data = dict(timestamp=timestamp, rgb_image=base64.b64encode(buffer))
+        # The JPEG bytes are pickled as is, pickle handles binary data
+        data = dict(timestamp=timestamp, rgb_image=buffer.tobytes())
         self.socket.send(b"rgb_image " + pickle.dumps(data, protocol=-1))
 
     def pub_depth_image(self, depth_image, timestamp):
@@ -152,14 +162,19 @@ class ZMQCameraPublisher(object):
 
 
 class ZMQCameraSubscriber(threading.Thread):
-    def __init__(self, host, port, topic_type):
+    def __init__(self, host, port, topic_type, recv_timeout=None):
         self._host, self._port, self._topic_type = host, port, topic_type
+        # Receive timeout in milliseconds. When set, a recv that times out
+        # raises zmq.Again instead of blocking forever.
+        self._recv_timeout = recv_timeout
         self._init_subscriber()
 
     def _init_subscriber(self):
         self.context = zmq.Context()
         self.socket = self.context.socket(zmq.SUB)
         self.socket.setsockopt(zmq.CONFLATE, 1)
+        if self._recv_timeout is not None:
+            self.socket.setsockopt(zmq.RCVTIMEO, self._recv_timeout)
         print("tcp://{}:{}".format(self._host, self._port))
         self.socket.connect("tcp://{}:{}".format(self._host, self._port))
 
@@ -176,12 +191,34 @@ class ZMQCameraSubscriber(threading.Thread):
         return pickle.loads(raw_array)
 
     def recv_rgb_image(self):
+        """Returns the latest published frame and its timestamp.
+
+        The socket is conflated, so frames published since the previous call
+        are dropped rather than queued.
+        """
         raw_data = self.socket.recv()
         data = raw_data.lstrip(b"rgb_image ")
         data = pickle.loads(data)
-        encoded_data = np.fromstring(base64.b64decode(data["rgb_image"]), np.uint8)
+        encoded_data = np.frombuffer(data["rgb_image"], np.uint8)
         return cv2.imdecode(encoded_data, 1), data["timestamp"]
 
+    def recv_rgb_image_into(self, dst):
+        """Same as recv_rgb_image, but also writes the frame into dst.
+
+        The frame is resized to the size of dst unless it already matches.
+        """
+        image, timestamp = self.recv_rgb_image()
+        height, width = dst.shape[:2]
+        if image.shape[:2] == (height, width):
+            np.copyto(dst, image)
+        else:
+            if image.shape[1] > width:
+                interpolation = cv2.INTER_AREA
+            else:
+                interpolation = cv2.INTER_LINEAR
+            cv2.resize(image, (width, height), dst=dst, interpolation=interpolation)
+        return image, timestamp
+
     def recv_depth_image(self):
         raw_data = self.socket.recv()
         striped_data = raw_data.lstrip(b"depth_image ")
@@ -0,0 +1,118 @@
+import numpy as np
+from numba import njit
+from numpy.linalg import inv
+
+from frankateach.constants import H_R_V, H_R_V_star
+
+# The VR to robot frame transforms are constant, so split them into rotation
+# and translation and invert the rotations only once.
+R_R_V = np.ascontiguousarray(H_R_V[:3, :3], dtype=np.float64)
+t_R_V = np.ascontiguousarray(H_R_V[:3, 3], dtype=np.float64)
+R_R_V_INV = inv(R_R_V)
+R_R_V_star = np.ascontiguousarray(H_R_V_star[:3, :3], dtype=np.float64)
+t_R_V_star = np.ascontiguousarray(H_R_V_star[:3, 3], dtype=np.float64)
+R_R_V_STAR_INV = inv(R_R_V_star)
+
+
+@njit(cache=True)
+def _mat2quat(rot, out_quat):
+    # Shepperd's method, with the same (x, y, z, w) order and w >= 0 sign
+    # convention as transform_utils.mat2quat.
+    m00, m01, m02 = rot[0, 0], rot[0, 1], rot[0, 2]
+    m10, m11, m12 = rot[1, 0], rot[1, 1], rot[1, 2]
+    m20, m21, m22 = rot[2, 0], rot[2, 1], rot[2, 2]
+    trace = m00 + m11 + m22
+    if trace > 0.0:
+        s = 2.0 * np.sqrt(trace + 1.0)
+        w, x, y, z = 0.25 * s, (m21 - m12) / s, (m02 - m20) / s, (m10 - m01) / s
+    elif m00 > m11 and m00 > m22:
+        s = 2.0 * np.sqrt(1.0 + m00 - m11 - m22)
+        w, x, y, z = (m21 - m12) / s, 0.25 * s, (m01 + m10) / s, (m02 + m20) / s
+    elif m11 > m22:
+        s = 2.0 * np.sqrt(1.0 + m11 - m00 - m22)
+        w, x, y, z = (m02 - m20) / s, (m01 + m10) / s, 0.25 * s, (m12 + m21) / s
+    else:
+        s = 2.0 * np.sqrt(1.0 + m22 - m00 - m11)
+        w, x, y, z = (m10 - m01) / s, (m02 + m20) / s, (m12 + m21) / s, 0.25 * s
+    norm = np.sqrt(w * w + x * x + y * y + z * z)
+    if w < 0.0:
+        norm = -norm
+    out_quat[0] = x / norm
+    out_quat[1] = y / norm
+    out_quat[2] = z / norm
+    out_quat[3] = w / norm
+
+
+@njit(cache=True, fastmath=True)
+def compute_target_pose(
+    init_affine,
+    current_affine,
+    home_rot,
+    home_pos,
+    R_R_V,
+    R_R_V_inv,
+    R_R_V_star_inv,
+    t_R_V_star,
+    workspace_min,
+    workspace_max,
+    out_pos,
+    out_quat,
+):
+    """Retargets the controller motion since init_affine onto the home pose.
+
+    The relative motion inv(init_affine) @ current_affine is moved to the robot
+    frame (rotation through H_R_V, translation through H_R_V_star), applied to
+    the home pose and clipped to the workspace. The target position and
+    (x, y, z, w) quaternion are written into out_pos and out_quat.
+    """
+    # H_V_des = inv(init_affine) @ current_affine
+    des_rot = np.empty((3, 3))
+    des_trans = np.empty(3)
+    for i in range(3):
+        for j in range(3):
+            acc = 0.0
+            for k in range(3):
+                acc += init_affine[k, i] * current_affine[k, j]
+            des_rot[i, j] = acc
+        acc = 0.0
+        for k in range(3):
+            acc += init_affine[k, i] * (current_affine[k, 3] - init_affine[k, 3])
+        des_trans[i] = acc
+
+    # relative_rot = R_R_V_inv @ des_rot @ R_R_V and
+    # target_rot = home_rot @ relative_rot
+    tmp = np.empty((3, 3))
+    for i in range(3):
+        for j in range(3):
+            acc = 0.0
+            for k in range(3):
+                acc += des_rot[i, k] * R_R_V[k, j]
+            tmp[i, j] = acc
+    relative_rot = np.empty((3, 3))
+    for i in range(3):
+        for j in range(3):
+            acc = 0.0
+            for k in range(3):
+                acc += R_R_V_inv[i, k] * tmp[k, j]
+            relative_rot[i, j] = acc
+    target_rot = np.empty((3, 3))
+    for i in range(3):
+        for j in range(3):
+            acc = 0.0
+            for k in range(3):
+                acc += home_rot[i, k] * relative_rot[k, j]
+            target_rot[i, j] = acc
+    _mat2quat(target_rot, out_quat)
+
+    # relative_trans = R_R_V_star_inv @ (des_rot @ t + des_trans - t)
+    offset = np.empty(3)
+    for i in range(3):
+        acc = des_trans[i] - t_R_V_star[i]
+        for k in range(3):
+            acc += des_rot[i, k] * t_R_V_star[k]
+        offset[i] = acc
+    for i in range(3):
+        acc = home_pos[i]
+        for k in range(3):
+            acc += R_R_V_star_inv[i, k] * offset[k]
+        out_pos[i] = min(max(acc, workspace_min[i]), workspace_max[i])
@@ -1,5 +1,6 @@
 from collections import deque
 import time
+import numpy as np
 from frankateach.constants import HOST, RESKIN_STREAM_PORT
 from frankateach.network import ZMQKeypointPublisher, ZMQKeypointSubscriber
 from frankateach.utils import FrequencyTimer, notify_component_start
@@ -63,3 +64,20 @@ class ReskinSensorSubscriber:
     def get_sensor_state(self):
         reskin_state = self.reskin_subscriber.recv_keypoints()
         return reskin_state
+
+    def get_sensor_batch(self, num_samples):
+        """Returns the latest num_samples sensor readings, oldest first, as a
+        (num_samples, num_values) array.
+
+        The publisher attaches its recent readings to every message, so a
+        single message is enough when its history is long enough.
+        """
+        reskin_state = self.get_sensor_state()
+        sensor_history = reskin_state["sensor_history"]
+        if len(sensor_history) >= num_samples:
+            return np.array(sensor_history[-num_samples:], dtype=np.float32)
+
+        samples = [reskin_state["sensor_values"]]
+        while len(samples) < num_samples:
+            samples.append(self.get_sensor_state()["sensor_values"])
+        return np.array(samples, dtype=np.float32)
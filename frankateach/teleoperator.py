@@ -1,5 +1,5 @@
+import threading
 import time
-import pickle
 from frankateach.utils import notify_component_start
 from frankateach.network import (
     ZMQKeypointSubscriber,
@@ -12,34 +12,25 @@ from frankateach.constants import (
     HOST,
     STATE_PORT,
     VR_CONTROLLER_STATE_PORT,
-    H_R_V,
-    H_R_V_star,
+    VR_FREQ,
     ROBOT_WORKSPACE_MIN,
     ROBOT_WORKSPACE_MAX,
     GRIPPER_OPEN,
     GRIPPER_CLOSE,
 )
 from frankateach.messages import FrankaAction, FrankaState
+from frankateach.retargeting import (
+    R_R_V,
+    R_R_V_INV,
+    R_R_V_STAR_INV,
+    compute_target_pose,
+    t_R_V_star,
+)
+from frankateach.wire import pack_action, unpack_state
 
 from deoxys.utils import transform_utils
 
 import numpy as np
-from numpy.linalg import pinv
-
-
-def get_relative_affine(init_affine, current_affine):
-    H_V_des = pinv(init_affine) @ current_affine
-
-    # Transform to robot frame.
-    relative_affine_rot = (pinv(H_R_V) @ H_V_des @ H_R_V)[:3, :3]
-    relative_affine_trans = (pinv(H_R_V_star) @ H_V_des @ H_R_V_star)[:3, 3]
-
-    # Homogeneous coordinates
-    relative_affine = np.block(
-        [[relative_affine_rot, relative_affine_trans.reshape(3, 1)], [0, 0, 0, 1]]
-    )
-
-    return relative_affine
 
 
 class FrankaOperator:
@@ -73,9 +64,60 @@ class FrankaOperator:
         self.home_offset = (
             np.array(home_offset) if home_offset is not None else np.zeros(3)
         )
+        # Commanded pose, reused across ticks
+        self._target_pos = np.empty(3, dtype=np.float32)
+        self._target_quat = np.empty(4, dtype=np.float32)
+        # Quaternion commanded in human mode, where the target rotation is zero
+        self._human_target_quat = transform_utils.mat2quat(np.zeros((3, 3)))
+        # Compile the retargeting kernel now with the same argument types that
+        # are used while teleoperating, so that pressing A doesn't stall on it
+        compute_target_pose(
+            np.eye(4),
+            np.eye(4),
+            np.eye(3, dtype=np.float32),
+            np.zeros(3, dtype=np.float32),
+            R_R_V,
+            R_R_V_INV,
+            R_R_V_STAR_INV,
+            t_R_V_star,
+            ROBOT_WORKSPACE_MIN,
+            ROBOT_WORKSPACE_MAX,
+            self._target_pos,
+            self._target_quat,
+        )
+
+        # Controller states are received on a background thread so that the
+        # teleop loop always reads the latest one without blocking on the socket
+        self._controller_state = None
+        self._controller_state_lock = threading.Lock()
+        self._controller_state_ready = threading.Event()
+        self._stop_event = threading.Event()
+        self._controller_thread = threading.Thread(
+            target=self._controller_loop, daemon=True
+        )
+        self._controller_thread.start()
+
+    def _controller_loop(self):
+        while not self._stop_event.is_set():
+            # Poll with a timeout so that stop requests are noticed
+            if self._controller_state_subscriber.socket.poll(100):
+                controller_state = self._controller_state_subscriber.recv_keypoints()
+                with self._controller_state_lock:
+                    self._controller_state = controller_state
+                self._controller_state_ready.set()
+
+    def _set_home(self, home_rot, home_pos):
+        # Fixed dtypes so that compute_target_pose is not recompiled for others
+        self.home_rot = np.ascontiguousarray(home_rot, dtype=np.float32)
+        self.home_pos = np.ascontiguousarray(home_pos, dtype=np.float32)
+        # Cached since it is sent on every tick while teleop is paused
+        self._home_quat = transform_utils.mat2quat(home_rot)
 
     def _apply_retargeted_angles(self) -> None:
-        self.controller_state = self._controller_state_subscriber.recv_keypoints()
+        # Only blocks until the first controller state has arrived
+        self._controller_state_ready.wait()
+        with self._controller_state_lock:
+            self.controller_state = self._controller_state
 
         if self.is_first_frame:
             print("Resetting robot..")
@@ -84,10 +126,10 @@ class FrankaOperator:
                 quat=np.zeros(4),
                 gripper=self.gripper_state,
                 reset=True,
-                timestamp=time.time(),
+                timestamp=time.time_ns(),
             )
-            self.action_socket.send(bytes(pickle.dumps(action, protocol=-1)))
-            robot_state = pickle.loads(self.action_socket.recv())
+            self.action_socket.send(pack_action(action))
+            robot_state = unpack_state(self.action_socket.recv())
 
             # Move to offset position
             target_pos = robot_state.pos + self.home_offset
@@ -97,17 +139,14 @@ class FrankaOperator:
                 quat=target_quat.flatten().astype(np.float32),
                 gripper=self.gripper_state,
                 reset=False,
-                timestamp=time.time(),
+                timestamp=time.time_ns(),
             )
-            self.action_socket.send(bytes(pickle.dumps(action, protocol=-1)))
-            robot_state = pickle.loads(self.action_socket.recv())
+            self.action_socket.send(pack_action(action))
+            robot_state = unpack_state(self.action_socket.recv())
             # HOME <- Pos: [0.457632  0.0321814 0.2653815], Quat: [0.9998586  0.00880853 0.01421072 0.00179784]
 
             print(robot_state)
-            self.home_rot, self.home_pos = (
-                transform_utils.quat2mat(robot_state.quat),
-                robot_state.pos,
-            )
+            self._set_home(transform_utils.quat2mat(robot_state.quat), robot_state.pos)
 
             self.is_first_frame = False
         if self.controller_state.right_a:
@@ -118,23 +157,13 @@ class FrankaOperator:
             self.init_affine = None
             # receive the robot state
             self.action_socket.send(b"get_state")
-            robot_state: FrankaState = pickle.loads(self.action_socket.recv())
+            robot_state = self.action_socket.recv()
             if robot_state == b"state_error":
                 print("Error getting robot state")
                 return
+            robot_state: FrankaState = unpack_state(robot_state)
 
-            self.home_rot, self.home_pos = (
-                transform_utils.quat2mat(robot_state.quat),
-                robot_state.pos,
-            )
-
-        if self.start_teleop and self.teleop_mode == "robot":
-            relative_affine = get_relative_affine(
-                self.init_affine, self.controller_state.right_affine
-            )
-        else:
-            relative_affine = np.zeros((4, 4))
-            relative_affine[3, 3] = 1
+            self._set_home(transform_utils.quat2mat(robot_state.quat), robot_state.pos)
 
         gripper_action = None
         if self.teleop_mode == "robot":
@@ -146,44 +175,57 @@ class FrankaOperator:
         if gripper_action is not None and gripper_action != self.gripper_state:
             self.gripper_state = gripper_action
 
-        if self.start_teleop:
-            relative_pos, relative_rot = (
-                relative_affine[:3, 3],
-                relative_affine[:3, :3],
+        if self.start_teleop and self.teleop_mode == "robot":
+            target_pos, target_quat = self._target_pos, self._target_quat
+            compute_target_pose(
+                self.init_affine,
+                self.controller_state.right_affine,
+                self.home_rot,
+                self.home_pos,
+                R_R_V,
+                R_R_V_INV,
+                R_R_V_STAR_INV,
+                t_R_V_star,
+                ROBOT_WORKSPACE_MIN,
+                ROBOT_WORKSPACE_MAX,
+                target_pos,
+                target_quat,
             )
 
-            target_pos = self.home_pos + relative_pos
-            target_rot = self.home_rot @ relative_rot
-            target_quat = transform_utils.mat2quat(target_rot)
-
+        elif self.start_teleop:
+            # The controller is not tracked in human mode, so the relative
+            # affine is zero apart from its homogeneous coordinate. The target
+            # rotation is then always zero, see _human_target_quat.
             target_pos = np.clip(
-                target_pos,
+                self.home_pos,
                 a_min=ROBOT_WORKSPACE_MIN,
                 a_max=ROBOT_WORKSPACE_MAX,
+                out=self._target_pos,
             )
+            target_quat = self._target_quat
+            target_quat[:] = self._human_target_quat
 
         else:
-            target_pos, target_quat = (
-                self.home_pos + self.home_offset,
-                transform_utils.mat2quat(self.home_rot),
-            )
+            target_pos = np.add(self.home_pos, self.home_offset, out=self._target_pos)
+            target_quat = self._target_quat
+            target_quat[:] = self._home_quat
 
         action = FrankaAction(
-            pos=target_pos.flatten().astype(np.float32),
-            quat=target_quat.flatten().astype(np.float32),
+            pos=target_pos,
+            quat=target_quat,
             gripper=self.gripper_state,
             reset=False,
-            timestamp=time.time(),
+            timestamp=time.time_ns(),
         )
         if self.teleop_mode == "robot":
-            self.action_socket.send(bytes(pickle.dumps(action, protocol=-1)))
+            self.action_socket.send(pack_action(action))
         else:
             self.action_socket.send(b"get_state")
 
         # self.action_socket.send(bytes(pickle.dumps(action, protocol=-1)))
         robot_state = self.action_socket.recv()
 
-        robot_state = pickle.loads(robot_state)
+        robot_state = unpack_state(robot_state)
         robot_state.start_teleop = self.start_teleop
         # self.state_socket.send(bytes(pickle.dumps(robot_state, protocol=-1)))
         self.state_socket.pub_keypoints(robot_state, "robot_state")
@@ -193,13 +235,33 @@ class FrankaOperator:
         notify_component_start("Franka teleoperator control")
         print("Start controlling the robot hand using the Oculus Headset.\n")
 
+        # Ticks are scheduled against fixed deadlines so the rate does not drift.
+        # time.sleep is too coarse on its own, so the last stretch before each
+        # deadline is spent spinning.
+        period_ns = 10**9 // VR_FREQ
+        spin_ns = 200_000
+        deadline = time.monotonic_ns() + period_ns
         try:
             while True:
                 # Retargeting function
                 self._apply_retargeted_angles()
+
+                remaining_ns = deadline - time.monotonic_ns()
+                if remaining_ns > spin_ns:
+                    time.sleep((remaining_ns - spin_ns) / 1e9)
+                while time.monotonic_ns() < deadline:
+                    pass
+                deadline += period_ns
+                # Skip ticks missed during a long tick (e.g. a robot reset)
+                # rather than running them back to back
+                now = time.monotonic_ns()
+                if deadline < now:
+                    deadline = now + period_ns
         except KeyboardInterrupt:
             pass
         finally:
+            self._stop_event.set()
+            self._controller_thread.join()
             self._controller_state_subscriber.stop()
             self.action_socket.close()
 
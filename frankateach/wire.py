@@ -0,0 +1,70 @@
+import msgpack
+import numpy as np
+
+from frankateach.messages import FrankaAction, FrankaState
+
+# Arrays are sent as raw float32 bytes alongside the scalar fields, which is
+# much cheaper to encode and decode than pickling the dataclasses.
+WIRE_DTYPE = np.float32
+
+
+def _pack_array(array):
+    return np.ascontiguousarray(array, dtype=WIRE_DTYPE).tobytes()
+
+
+def _unpack_array(buffer):
+    # Copied so that the arrays are writable, like the unpickled ones were
+    return np.frombuffer(buffer, dtype=WIRE_DTYPE).copy()
+
+
+def _pack_scalar(value):
+    # Also accepts numpy scalars and 1-element arrays
+    return float(np.asarray(value).item())
+
+
+def pack_action(action: FrankaAction) -> bytes:
+    return msgpack.packb(
+        {
+            "p": _pack_array(action.pos),
+            "q": _pack_array(action.quat),
+            "g": _pack_scalar(action.gripper),
+            "r": bool(action.reset),
+            "t": action.timestamp,
+        },
+        use_bin_type=True,
+    )
+
+
+def unpack_action(buffer: bytes) -> FrankaAction:
+    data = msgpack.unpackb(buffer, raw=False)
+    return FrankaAction(
+        pos=_unpack_array(data["p"]),
+        quat=_unpack_array(data["q"]),
+        gripper=data["g"],
+        reset=data["r"],
+        timestamp=data["t"],
+    )
+
+
+def pack_state(state: FrankaState) -> bytes:
+    return msgpack.packb(
+        {
+            "p": _pack_array(state.pos),
+            "q": _pack_array(state.quat),
+            "g": _pack_scalar(state.gripper),
+            "t": state.timestamp,
+            "s": bool(state.start_teleop),
+        },
+        use_bin_type=True,
+    )
+
+
+def unpack_state(buffer: bytes) -> FrankaState:
+    data = msgpack.unpackb(buffer, raw=False)
+    return FrankaState(
+        pos=_unpack_array(data["p"]),
+        quat=_unpack_array(data["q"]),
+        gripper=data["g"],
+        timestamp=data["t"],
+        start_teleop=data["s"],
+    )
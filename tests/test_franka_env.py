@@ -0,0 +1,65 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+pytest.importorskip("gym")
+pytest.importorskip("cv2")
+zmq = pytest.importorskip("zmq")
+franka_env = pytest.importorskip("franka_env.envs.franka_env")
+
+
+class FakeSubscriber:
+    def __init__(self, value, delay=0.0):
+        self.value = value
+        self.delay = delay
+        self.done = threading.Event()
+
+    def recv_rgb_image_into(self, dst):
+        time.sleep(self.delay)
+        dst[...] = self.value
+        self.done.set()
+        return dst.copy(), 0.0
+
+
+class TimingOutSubscriber:
+    def recv_rgb_image_into(self, dst):
+        raise zmq.Again()
+
+
+def make_env(subscribers):
+    # Skip __init__, which connects to the robot and camera servers
+    env = franka_env.FrankaEnv.__new__(franka_env.FrankaEnv)
+    env.width, env.height, env.n_channels = 8, 6, 3
+    env.image_subscribers = subscribers
+    env._cam_pool = ThreadPoolExecutor(max_workers=len(subscribers))
+    return env
+
+
+def test_get_images_fills_one_frame_per_camera():
+    env = make_env({1: FakeSubscriber(10), 51: FakeSubscriber(20)})
+    try:
+        image_dict = env._get_images()
+    finally:
+        env._cam_pool.shutdown()
+
+    assert list(image_dict) == ["pixels1", "pixels51"]
+    assert env.curr_frames.shape == (2, 6, 8, 3)
+    assert (image_dict["pixels1"] == 10).all()
+    assert (image_dict["pixels51"] == 20).all()
+    assert np.shares_memory(image_dict["pixels51"], env.curr_frames)
+    assert len(env.curr_images) == 2
+
+
+def test_get_images_waits_for_all_cameras_before_raising():
+    slow_subscriber = FakeSubscriber(10, delay=0.2)
+    env = make_env({1: TimingOutSubscriber(), 2: slow_subscriber})
+    try:
+        with pytest.raises(zmq.Again):
+            env._get_images()
+        # The other camera's receive must not outlive the failed call
+        assert slow_subscriber.done.is_set()
+    finally:
+        env._cam_pool.shutdown()
@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("numba")
+Rotation = pytest.importorskip("scipy.spatial.transform").Rotation
+
+from frankateach.constants import (  # noqa: E402
+    H_R_V,
+    H_R_V_star,
+    ROBOT_WORKSPACE_MAX,
+    ROBOT_WORKSPACE_MIN,
+)
+from frankateach.retargeting import (  # noqa: E402
+    R_R_V,
+    R_R_V_INV,
+    R_R_V_STAR_INV,
+    compute_target_pose,
+    t_R_V_star,
+)
+
+
+def reference_target_pose(init_affine, current_affine, home_rot, home_pos):
+    """Plain 4x4 NumPy version of the retargeting that the kernel fuses."""
+    H_V_des = np.linalg.pinv(init_affine) @ current_affine
+    relative_rot = (np.linalg.pinv(H_R_V) @ H_V_des @ H_R_V)[:3, :3]
+    relative_trans = (np.linalg.pinv(H_R_V_star) @ H_V_des @ H_R_V_star)[:3, 3]
+
+    target_pos = np.clip(
+        home_pos + relative_trans, ROBOT_WORKSPACE_MIN, ROBOT_WORKSPACE_MAX
+    )
+    return target_pos, reference_mat2quat(home_rot @ relative_rot)
+
+
+def reference_mat2quat(rmat):
+    # Same eigen decomposition as deoxys' transform_utils.mat2quat
+    M = np.asarray(rmat, dtype=np.float32)[:3, :3]
+    m00, m01, m02 = M[0]
+    m10, m11, m12 = M[1]
+    m20, m21, m22 = M[2]
+    K = np.array(
+        [
+            [m00 - m11 - m22, 0.0, 0.0, 0.0],
+            [m01 + m10, m11 - m00 - m22, 0.0, 0.0],
+            [m02 + m20, m12 + m21, m22 - m00 - m11, 0.0],
+            [m21 - m12, m02 - m20, m10 - m01, m00 + m11 + m22],
+        ]
+    )
+    K /= 3.0
+    w, V = np.linalg.eigh(K)
+    q = V[[3, 0, 1, 2], np.argmax(w)]
+    if q[0] < 0.0:
+        np.negative(q, q)
+    return q[[1, 2, 3, 0]]
+
+
+def random_affine(rng):
+    affine = np.eye(4)
+    affine[:3, :3] = Rotation.random(random_state=rng).as_matrix()
+    affine[:3, 3] = rng.normal(scale=0.2, size=3)
+    return affine
+
+
+def test_compute_target_pose_matches_reference():
+    rng = np.random.default_rng(0)
+    out_pos = np.empty(3, dtype=np.float32)
+    out_quat = np.empty(4, dtype=np.float32)
+    home_pos = np.array([0.45, 0.0, 0.3], dtype=np.float32)
+
+    for _ in range(200):
+        init_affine, current_affine = random_affine(rng), random_affine(rng)
+        home_rot = Rotation.random(random_state=rng).as_matrix().astype(np.float32)
+
+        compute_target_pose(
+            init_affine,
+            current_affine,
+            home_rot,
+            home_pos,
+            R_R_V,
+            R_R_V_INV,
+            R_R_V_STAR_INV,
+            t_R_V_star,
+            ROBOT_WORKSPACE_MIN,
+            ROBOT_WORKSPACE_MAX,
+            out_pos,
+            out_quat,
+        )
+        expected_pos, expected_quat = reference_target_pose(
+            init_affine, current_affine, home_rot, home_pos
+        )
+
+        np.testing.assert_allclose(out_pos, expected_pos, atol=1e-5)
+        # q and -q are the same rotation; the sign is only ambiguous when w ~ 0
+        if abs(expected_quat[3]) < 1e-4 and np.dot(out_quat, expected_quat) < 0:
+            expected_quat = -expected_quat
+        np.testing.assert_allclose(out_quat, expected_quat, atol=1e-4)
+
+
+def test_identity_motion_keeps_home_pose():
+    affine = np.eye(4)
+    home_rot = np.eye(3, dtype=np.float32)
+    home_pos = np.array([0.45, 0.0, 0.3], dtype=np.float32)
+    out_pos = np.empty(3, dtype=np.float32)
+    out_quat = np.empty(4, dtype=np.float32)
+
+    compute_target_pose(
+        affine,
+        affine,
+        home_rot,
+        home_pos,
+        R_R_V,
+        R_R_V_INV,
+        R_R_V_STAR_INV,
+        t_R_V_star,
+        ROBOT_WORKSPACE_MIN,
+        ROBOT_WORKSPACE_MAX,
+        out_pos,
+        out_quat,
+    )
+
+    np.testing.assert_allclose(out_pos, home_pos)
+    np.testing.assert_allclose(out_quat, [0.0, 0.0, 0.0, 1.0])
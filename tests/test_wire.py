@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("msgpack")
+pytest.importorskip("scipy")
+
+from frankateach.messages import FrankaAction, FrankaState  # noqa: E402
+from frankateach.wire import (  # noqa: E402
+    pack_action,
+    pack_state,
+    unpack_action,
+    unpack_state,
+)
+
+POS = [0.45, -0.1, 0.3]
+QUAT = [0.0, 0.0, 0.0, 1.0]
+
+ARRAY_TYPES = [
+    pytest.param(list, id="list"),
+    pytest.param(lambda x: np.array(x, dtype=np.float64), id="float64"),
+    pytest.param(lambda x: np.array(x, dtype=np.float32), id="float32"),
+]
+
+GRIPPERS = [
+    pytest.param(-1, id="int"),
+    pytest.param(np.float32(1.0), id="numpy-scalar"),
+    pytest.param(np.array([1.0]), id="1-element-array"),
+]
+
+
+def assert_wire_array(array, expected):
+    assert isinstance(array, np.ndarray)
+    assert array.dtype == np.float32
+    assert array.flags.writeable
+    np.testing.assert_allclose(array, expected, rtol=1e-6)
+
+
+@pytest.mark.parametrize("gripper", GRIPPERS)
+@pytest.mark.parametrize("to_array", ARRAY_TYPES)
+def test_action_round_trip(to_array, gripper):
+    action = FrankaAction(
+        pos=to_array(POS),
+        quat=to_array(QUAT),
+        gripper=gripper,
+        reset=True,
+        timestamp=1_700_000_000_123_456_789,
+    )
+
+    decoded = unpack_action(pack_action(action))
+
+    assert_wire_array(decoded.pos, POS)
+    assert_wire_array(decoded.quat, QUAT)
+    assert decoded.gripper == float(np.asarray(gripper).item())
+    assert decoded.reset is True
+    assert decoded.timestamp == action.timestamp
+
+
+@pytest.mark.parametrize("gripper", GRIPPERS)
+@pytest.mark.parametrize("to_array", ARRAY_TYPES)
+def test_state_round_trip(to_array, gripper):
+    state = FrankaState(
+        pos=to_array(POS),
+        quat=to_array(QUAT),
+        gripper=gripper,
+        timestamp=1_700_000_000_123_456_789,
+        start_teleop=True,
+    )
+
+    decoded = unpack_state(pack_state(state))
+
+    assert_wire_array(decoded.pos, POS)
+    assert_wire_array(decoded.quat, QUAT)
+    assert decoded.gripper == float(np.asarray(gripper).item())
+    assert decoded.timestamp == state.timestamp
+    assert decoded.start_teleop is True
+
+
+def test_decoded_arrays_can_be_modified_in_place():
+    state = FrankaState(pos=np.array(POS), quat=np.array(QUAT), gripper=-1, timestamp=0)
+    decoded = unpack_state(pack_state(state))
+
+    decoded.pos += 1.0
+    decoded.quat[0] = 0.5
+
+    np.testing.assert_allclose(decoded.pos, np.array(POS) + 1.0, rtol=1e-6)
+
+
+def test_unpack_state_rejects_state_error():
+    # FrankaEnv.get_state relies on a failed state request raising here
+    with pytest.raises(ValueError):
+        unpack_state(b"state_error")